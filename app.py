@@ -6,215 +6,498 @@ Endpoints:
 - GET /                 -> serves the frontend (index.html)
 - GET /api/<symbol>     -> returns JSON with financial data for <symbol>
 - GET /api/recent       -> returns recent searches from SQLite
+- GET /api/recent/<id>/data -> returns the stored payload of one recent search
+- GET /api/batch        -> returns JSON for several symbols (?symbols=AAPL,MSFT)
 - GET /export/<symbol>  -> export results as CSV or XLSX (?format=csv|xlsx)
 """
 
-import json
+import csv
+import hashlib
+import math
 import sqlite3
 import io
 import datetime
-from typing import List, Dict, Any, Optional
+import queue
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import quote
+from typing import List, Dict, Any, Optional, Tuple
 
 from flask import (
     Flask,
+    Response,
     jsonify,
     request,
     send_file,
     render_template,
-    g,
 )
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 import yfinance as yf
+import numpy as np
 import pandas as pd
+import orjson
+import xlsxwriter
+import zstandard as zstd
+from cachetools import TTLCache
 
 DB_PATH = "searches.db"
 
+# ANALYZE only needs to run once per process to refresh planner statistics
+_db_analyzed = False
+
+# One sqlite connection per thread, kept open across requests
+_tls = threading.local()
+
+# Search records waiting for the background writer, and the most rows it inserts per commit
+WRITE_Q: "queue.Queue[tuple]" = queue.Queue()
+WRITE_BATCH_SIZE = 50
+
+# searches.data_json holds zstd-compressed JSON at this level
+ZSTD_LEVEL = 3
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+# Per-symbol payload cache (15 minutes); TTLCache is not thread-safe on its own
+SYMBOL_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=900)
+_symbol_cache_lock = threading.Lock()
+
+# The only ticker.info fields the payload uses
+INFO_FIELDS = (
+    "shortName",
+    "longName",
+    "symbol",
+    "marketCap",
+    "trailingPE",
+    "forwardPE",
+    "sector",
+    "website",
+    "longBusinessSummary",
+    "exchange",
+    "fullTimeEmployees",
+)
+
+# Browsers may reuse a payload for a minute and revalidate it via ETag after that
+CACHE_CONTROL = "private, max-age=60, stale-while-revalidate=600"
+
+# Row labels we read from the financials DataFrame; "total revenue" takes priority over plain "revenue"
+_STATEMENT_ROWS_RE = re.compile(
+    r"(?P<total_revenue>total ?revenues?)|(?P<revenue>revenue)|(?P<net_income>net[ _]?income)", re.I
+)
+
+# Pool for concurrent yfinance fetches, and how long a lookup waits for them (seconds).
+# Each lookup holds 3 workers and a fetch that overruns the wait can't be cancelled, so size
+# the pool for a full /api/batch plus several single lookups rather than queueing behind them.
+FETCH_WORKERS = 48
+FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="yf-fetch")
+FETCH_TIMEOUT = 20
+
+# Upper bound on symbols accepted by /api/batch. Symbols are looked up concurrently on their
+# own pool (separate from FETCH_EXECUTOR, which each lookup waits on) under one overall deadline.
+BATCH_MAX_SYMBOLS = 10
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=BATCH_MAX_SYMBOLS, thread_name_prefix="batch-lookup")
+BATCH_TIMEOUT = FETCH_TIMEOUT + 5
+
+# orjson options shared by the JSON provider and DB serialization
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. Keeps the default provider's key sorting
+    and debug-mode indentation.
+    """
+
+    def _options(self, sort_keys: bool, indent: bool) -> int:
+        option = ORJSON_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = self._options(kwargs.get("sort_keys", self.sort_keys), bool(kwargs.get("indent")))
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Same as the default provider, but hands orjson's bytes straight to the response
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(self.sort_keys, indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.json = OrjsonProvider(app)
+
+# Compress JSON and CSV responses (xlsx files are already zip-compressed)
+app.config["COMPRESS_MIMETYPES"] = ["application/json", "text/csv"]
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+# Streamed responses (CSV export) use their own list, which defaults to include zstd and deflate
+app.config["COMPRESS_ALGORITHM_STREAMING"] = ["br"]
+Compress(app)
+
+
+# searches columns; timestamp is milliseconds since the epoch (UTC)
+SEARCHES_COLUMNS = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    company TEXT,
+    data_json BLOB,
+    timestamp INTEGER NOT NULL
+"""
 
 
-def get_db():
+def _timestamp_type(db: sqlite3.Connection) -> str:
+    return next((r["type"].upper() for r in db.execute("PRAGMA table_info(searches)") if r["name"] == "timestamp"), "")
+
+
+def _migrate_timestamps(db: sqlite3.Connection) -> None:
     """
-    Get a sqlite3 connection (simple wrapper). Ensures the table exists.
+    Rebuild a searches table from before integer timestamps, converting its ISO-8601 strings.
     """
-    db = getattr(g, "_database", None)
-    if db is None:
-        db = g._database = sqlite3.connect(DB_PATH)
-        db.row_factory = sqlite3.Row
-        # Ensure table exists
-        db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS searches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                company TEXT,
-                data_json TEXT,
-                timestamp TEXT NOT NULL
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        # Another worker may have migrated while we waited for the lock
+        if _timestamp_type(db) == "TEXT":
+            db.execute(f"CREATE TABLE searches_new ({SEARCHES_COLUMNS})")
+            db.execute(
+                """
+                INSERT INTO searches_new (id, symbol, company, data_json, timestamp)
+                SELECT id, symbol, company, data_json,
+                       COALESCE(CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER), 0)
+                FROM searches
+                """
             )
-            """
-        )
+            db.execute("DROP TABLE searches")
+            db.execute("ALTER TABLE searches_new RENAME TO searches")
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def connect_db() -> sqlite3.Connection:
+    """
+    Open a new sqlite3 connection with our pragmas applied. Ensures the table exists.
+    """
+    global _db_analyzed
+    db = sqlite3.connect(DB_PATH)
+    db.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a write is in progress
+    db.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-64000;
+        """
+    )
+    # Ensure table exists
+    db.execute(f"CREATE TABLE IF NOT EXISTS searches ({SEARCHES_COLUMNS})")
+    if _timestamp_type(db) == "TEXT":
+        _migrate_timestamps(db)
+    # Older databases appended a row per lookup; keep the newest per symbol before enforcing uniqueness
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_searches_symbol'").fetchone() is None:
+        db.execute("DELETE FROM searches WHERE id NOT IN (SELECT MAX(id) FROM searches GROUP BY symbol)")
+    # One row per symbol; the listing index covers the recent-searches query so it never reads data_json
+    db.executescript(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_searches_symbol ON searches(symbol);
+        CREATE INDEX IF NOT EXISTS idx_searches_recent ON searches(timestamp DESC, symbol, company);
+        DROP INDEX IF EXISTS idx_searches_symbol;
+        DROP INDEX IF EXISTS idx_searches_ts;
+        DROP INDEX IF EXISTS idx_searches_listing;
+        """
+    )
+    if not _db_analyzed:
+        db.execute("ANALYZE")
+        _db_analyzed = True
+    db.commit()
     return db
 
 
-@app.teardown_appcontext
-def close_connection(exception):
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+def get_db():
+    """
+    Get this thread's sqlite3 connection, opening it on first use.
+    Connections are reused across requests so page cache and mmap stay warm.
+    """
+    db = getattr(_tls, "conn", None)
+    if db is None:
+        db = _tls.conn = connect_db()
+    return db
+
+
+def _search_writer() -> None:
+    """
+    Background loop that drains WRITE_Q into SQLite, one executemany + commit per batch.
+    Uses its own connection since sqlite3 connections are per-thread.
+    """
+    db = connect_db()
+    # zstd compressors are not thread-safe; this one is only used by the writer
+    compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL)
+    while True:
+        # Block for the next record, then take whatever else queued up meanwhile
+        batch = [WRITE_Q.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(WRITE_Q.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            db.executemany(
+                """
+                INSERT INTO searches (symbol, company, data_json, timestamp) VALUES (?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    company = excluded.company,
+                    data_json = excluded.data_json,
+                    timestamp = excluded.timestamp
+                """,
+                [
+                    (symbol, company, sqlite3.Binary(compressor.compress(orjson.dumps(data, option=ORJSON_OPTIONS))), ts)
+                    for symbol, company, data, ts in batch
+                ],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            app.logger.exception("Failed to save %d search record(s)", len(batch))
+        finally:
+            for _ in batch:
+                WRITE_Q.task_done()
+
+
+def _ensure_writer() -> None:
+    """
+    Start the background writer on first use (after any worker fork).
+    """
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_search_writer, name="search-writer", daemon=True)
+            _writer_thread.start()
 
 
 def save_search(symbol: str, company: str, data: Dict[str, Any]) -> None:
     """
-    Save a search record into SQLite. Stores the returned JSON.
+    Queue a search record for the background writer. Stores the returned JSON,
+    replacing any earlier record for the same symbol.
     """
-    db = get_db()
-    db.execute(
-        "INSERT INTO searches (symbol, company, data_json, timestamp) VALUES (?, ?, ?, ?)",
-        (symbol.upper(), company, json.dumps(data), datetime.datetime.utcnow().isoformat() + "Z"),
-    )
-    db.commit()
+    _ensure_writer()
+    WRITE_Q.put((symbol.upper(), company, data, int(time.time() * 1000)))
+
+
+def format_timestamp(ms: int) -> str:
+    """
+    ISO-8601 UTC string for a searches.timestamp value.
+    """
+    ts = datetime.datetime.fromtimestamp(ms / 1000, tz=datetime.timezone.utc)
+    return ts.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def decode_data_json(value: Any, decompressor: zstd.ZstdDecompressor) -> Optional[Dict[str, Any]]:
+    """
+    Decode a searches.data_json value: zstd-compressed bytes, or plain JSON text from older rows.
+    """
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = decompressor.decompress(value)
+    return orjson.loads(value)
 
 
 def fetch_recent(limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    List recent searches, newest first. Stored payloads are loaded separately via fetch_search_data.
+    """
     db = get_db()
-    cur = db.execute("SELECT id, symbol, company, data_json, timestamp FROM searches ORDER BY id DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    results = []
-    for r in rows:
-        results.append(
-            {
-                "id": r["id"],
-                "symbol": r["symbol"],
-                "company": r["company"],
-                "data": json.loads(r["data_json"]) if r["data_json"] else None,
-                "timestamp": r["timestamp"],
-            }
-        )
-    return results
+    cur = db.execute("SELECT id, symbol, company, timestamp FROM searches ORDER BY timestamp DESC LIMIT ?", (limit,))
+    return [
+        {"id": r["id"], "symbol": r["symbol"], "company": r["company"], "timestamp": format_timestamp(r["timestamp"])}
+        for r in cur.fetchall()
+    ]
+
+
+def fetch_search_data(search_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Load the stored payload of one search. Returns None if the search doesn't exist.
+    """
+    db = get_db()
+    row = db.execute("SELECT data_json FROM searches WHERE id = ?", (search_id,)).fetchone()
+    if row is None:
+        return None
+    return {"data": decode_data_json(row["data_json"], zstd.ZstdDecompressor())}
 
 
 def dollars_or_none(value: Optional[int]) -> Optional[float]:
     if value is None:
         return None
     try:
-        return float(value)
+        value = float(value)
     except Exception:
         return None
+    # fast_info reports a missing market cap as NaN
+    return value if math.isfinite(value) else None
 
 
-def find_row_like(df: pd.DataFrame, substrings: List[str]) -> Optional[str]:
+def cell_value(value: Any) -> Any:
     """
-    Try to find an index label in df that contains one of substrings (case-insensitive).
-    Returns the matching index label or None.
+    Value as written to an export cell: NaN/inf become blanks, like pandas wrote them.
     """
-    if df is None or df.empty:
+    if isinstance(value, float) and not math.isfinite(value):
         return None
-    labels = [str(l).lower() for l in df.index]
-    for s in substrings:
-        s = s.lower()
-        for i, lab in enumerate(labels):
-            if s in lab:
-                return df.index[i]
-    return None
+    return value
 
 
-def extract_revenue_history(financials: pd.DataFrame, years: int = 5) -> List[Dict[str, Any]]:
+def find_statement_rows(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
     """
-    Extract last N years of revenue from financials DataFrame (columns are periods).
-    Returns list of {year: YYYY, revenue: int}
+    Locate the revenue and net income rows of a financials DataFrame in one pass over its labels.
+    Returns (revenue_label, net_income_label); either may be None.
     """
-    if financials is None or financials.empty:
-        return []
-    # Try several variants for revenue row names
-    revenue_row = find_row_like(financials, ["total revenue", "totalrevenue", "revenue", "totalrevenues"])
+    if df is None or df.empty:
+        return None, None
+    groups = df.index.astype(str).str.extract(_STATEMENT_ROWS_RE)
+
+    def first(group: str) -> Optional[str]:
+        hits = np.flatnonzero(groups[group].notna().to_numpy())
+        return df.index[hits[0]] if hits.size else None
+
+    revenue_row = first("total_revenue")
     if revenue_row is None:
-        return []
-    # financials columns are timestamps; convert to years (if possible) and pick most recent N
-    series = financials.loc[revenue_row]
-    # Series may have columns as datetimes or strings; try to parse year from column labels
-    rev_list = []
-    # iterate columns in reverse order (most recent first)
-    for col in list(series.columns)[::-1][:years]:
-        value = series[col]
-        try:
-            # derive year label
-            if isinstance(col, (pd.Timestamp, datetime.datetime)):
-                year = col.year
-            else:
-                # try to parse as str then extract year
-                col_str = str(col)
-                # common format: '2022' or '2022-12-31'
-                year = int(col_str[:4])
-        except Exception:
-            year = str(col)
-        # Convert value to numeric (some values are in thousand? yfinance returns raw)
-        try:
-            num = float(value) if (value is not None and not pd.isna(value)) else None
-        except Exception:
-            num = None
-        rev_list.append({"year": year, "revenue": num})
-    # Return in chronological order (oldest-first)
-    return rev_list[::-1]
+        revenue_row = first("revenue")
+    return revenue_row, first("net_income")
 
 
-@app.route("/")
-def index():
-    return render_template("index.html")
+def period_order(periods: pd.Index) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Positions that put financials periods oldest-first, plus the parsed periods
+    (NaT for labels that aren't dates, in which case the original order is kept).
+    """
+    # financials columns are period timestamps; parse them all at once
+    dates = pd.to_datetime(periods, errors="coerce")
+    if dates.hasnans:
+        return np.arange(len(dates)), dates
+    # yfinance lists periods newest-first
+    return dates.argsort(), dates
 
 
-@app.route("/api/<symbol>", methods=["GET"])
-def get_symbol(symbol):
+def extract_revenue_history(revenue: pd.Series, years: int = 5) -> List[Dict[str, Any]]:
     """
-    Main API endpoint to fetch financial data for a symbol.
-    Uses yfinance under the hood. Returns JSON:
-    {
-      symbol, companyName, marketCap, revenue (latest), netIncome (latest),
-      peRatio, sector, latestAnnualReportLink, revenueHistory: [{year, revenue}, ...]
-    }
+    Extract last N years from the revenue row of a financials DataFrame (index are periods).
+    Returns list of {year: YYYY, revenue: float}, oldest-first
     """
-    symbol = symbol.strip().upper()
-    if not symbol:
-        return jsonify({"error": "Symbol required"}), 400
+    order, dates = period_order(revenue.index)
+    order = order[-years:]
+    values = pd.to_numeric(revenue, errors="coerce").to_numpy(dtype="float64")[order]
+    year_nums = dates.year.to_numpy(dtype="float64", na_value=np.nan)[order]
+    # Unparseable period labels are passed through as strings
+    year_labels = [str(col) if np.isnan(y) else int(y) for col, y in zip(revenue.index[order], year_nums)]
+    return [{"year": y, "revenue": None if np.isnan(v) else float(v)} for y, v in zip(year_labels, values)]
 
-    try:
-        ticker = yf.Ticker(symbol)
-    except Exception as e:
-        return jsonify({"error": f"Failed to create ticker: {str(e)}"}), 500
 
-    # Guard: sometimes yfinance returns empty info
-    info = {}
+def _fetch_outcome(future: Future) -> Tuple[Any, bool]:
+    """
+    (result, ok) for a fetch future. ok is False, and the result None, if it failed or is still running.
+    """
+    if not future.done():
+        future.cancel()
+        return None, False
     try:
-        info = ticker.info or {}
+        return future.result(), True
     except Exception:
-        info = {}
+        return None, False
+
+
+def has_financial_data(result: Dict[str, Any]) -> bool:
+    """
+    True if the payload has at least one of the key metrics populated.
+    """
+    return any(result.get(k) is not None for k in ("marketCap", "revenue", "netIncome", "peRatio", "sector"))
+
+
+def build_symbol_payload(symbol: str) -> Dict[str, Any]:
+    """
+    Fetch financial data for an already-normalized symbol and build the API payload.
+    Payloads with data whose fetches all succeeded are cached in SYMBOL_CACHE.
+    """
+    with _symbol_cache_lock:
+        cached = SYMBOL_CACHE.get(symbol)
+    if cached is not None:
+        return cached
+
+    # Leave the HTTP session to yfinance: it pools and browser-impersonates its own
+    ticker = yf.Ticker(symbol)
+
+    # info, financials and earnings are independent HTTP round-trips; fetch them concurrently
+    deadline = time.monotonic() + FETCH_TIMEOUT
+    futures = {
+        "info": FETCH_EXECUTOR.submit(lambda: ticker.info),
+        "financials": FETCH_EXECUTOR.submit(lambda: ticker.financials),
+        "earnings": FETCH_EXECUTOR.submit(lambda: ticker.earnings),
+    }
+    wait(futures.values(), timeout=FETCH_TIMEOUT)
+    outcomes = {name: _fetch_outcome(future) for name, future in futures.items()}
+    fetched = {name: value for name, (value, _) in outcomes.items()}
+    # A failed fetch may be transient; don't pin its partial payload in the cache
+    complete = all(ok for _, ok in outcomes.values())
+
+    # Guard: sometimes yfinance returns empty info
+    raw_info = fetched["info"] or {}
+    # Single pass over the large info dict; every INFO_FIELDS key is present below
+    info = {k: raw_info.get(k) for k in INFO_FIELDS}
+
+    # fast_info only knows price-derived fields; use it when info came back without a market cap.
+    # It makes its own round-trips, so it runs on the pool under what is left of the same deadline.
+    if info["marketCap"] is None and outcomes["info"][1]:
+        future = FETCH_EXECUTOR.submit(lambda: ticker.fast_info.market_cap)
+        wait([future], timeout=max(0.0, deadline - time.monotonic()))
+        info["marketCap"], ok = _fetch_outcome(future)
+        complete = complete and ok
 
     # Basic fields from info
-    company_name = info.get("shortName") or info.get("longName") or info.get("symbol") or symbol
-    market_cap = dollars_or_none(info.get("marketCap"))
-    pe_ratio = info.get("trailingPE") or info.get("forwardPE") or None
-    sector = info.get("sector") or None
+    company_name = info["shortName"] or info["longName"] or info["symbol"] or symbol
+    market_cap = dollars_or_none(info["marketCap"])
+    pe_ratio = info["trailingPE"] or info["forwardPE"] or None
+    sector = info["sector"] or None
 
     # Financial statements: try to load annual financials DataFrame
     revenue_latest = None
     net_income_latest = None
     revenue_history = []
     try:
-        financials = ticker.financials  # annual financials
+        financials = fetched["financials"]  # annual financials
         # financials is a DataFrame where rows are labels, columns are periods
         if financials is not None and not financials.empty:
-            # Extract revenue history (up to 5 years)
-            revenue_history = extract_revenue_history(financials, years=5)
-            if revenue_history:
-                revenue_latest = revenue_history[-1]["revenue"]
-            # Try to find net income row
-            net_row = find_row_like(financials, ["net income", "netincome", "net income common", "net_income"])
-            if net_row:
-                try:
-                    series = financials.loc[net_row]
-                    # pick latest available column (right-most)
-                    latest_col = list(series.columns)[-1]
-                    net_income_latest = float(series[latest_col]) if not pd.isna(series[latest_col]) else None
-                except Exception:
-                    net_income_latest = None
+            revenue_row, net_row = find_statement_rows(financials)
+            found = [row for row in (revenue_row, net_row) if row is not None]
+            if found:
+                # Slice both rows at once; drop repeated labels so each .loc below is a Series
+                rows = financials.loc[found]
+                rows = rows[~rows.index.duplicated()]
+                if revenue_row is not None:
+                    # Extract revenue history (up to 5 years)
+                    revenue_history = extract_revenue_history(rows.loc[revenue_row], years=5)
+                    if revenue_history:
+                        revenue_latest = revenue_history[-1]["revenue"]
+                if net_row is not None:
+                    try:
+                        # pick latest available period
+                        net_income = rows.loc[net_row]
+                        order, _ = period_order(net_income.index)
+                        latest = pd.to_numeric(net_income, errors="coerce").to_numpy(dtype="float64")[order[-1]]
+                        net_income_latest = None if np.isnan(latest) else float(latest)
+                    except Exception:
+                        net_income_latest = None
     except Exception:
         financials = None
 
@@ -222,7 +505,7 @@ def get_symbol(symbol):
     if revenue_latest is None or net_income_latest is None:
         try:
             # try ticker.earnings (DataFrame of yearly earnings usually has 'Revenue' and 'Earnings')
-            earnings = ticker.earnings  # usually a dataframe with 'Revenue' and 'Earnings'
+            earnings = fetched["earnings"]  # usually a dataframe with 'Revenue' and 'Earnings'
             if earnings is not None and not earnings.empty:
                 # earnings is chronological ascending by year; pick last row
                 last = earnings.iloc[-1]
@@ -238,7 +521,7 @@ def get_symbol(symbol):
             pass
 
     # Latest annual report link: use website (investor relations) if present, and SEC search as fallback
-    website = info.get("website")
+    website = info["website"]
     # create SEC search link using symbol/company name to help user find 10-K/annual reports
     sec_search_link = f"https://www.sec.gov/edgar/search/#/q={symbol}"
     # A helpful investor relations search (attempt using company name)
@@ -256,21 +539,111 @@ def get_symbol(symbol):
         "sector": sector,
         "latestAnnualReportLink": latest_annual_report_link,
         "revenueHistory": revenue_history,
-        "rawInfo": {k: info.get(k) for k in ["longBusinessSummary", "website", "exchange", "fullTimeEmployees"]},
+        "rawInfo": {k: info[k] for k in ("longBusinessSummary", "website", "exchange", "fullTimeEmployees")},
+    }
+
+    if complete and has_financial_data(result):
+        with _symbol_cache_lock:
+            SYMBOL_CACHE[symbol] = result
+    return result
+
+
+def payload_etag(payload: Dict[str, Any], variant: str = "") -> str:
+    """
+    Content hash of a payload, used as its ETag. variant distinguishes renderings (e.g. csv/xlsx).
+    """
+    digest = hashlib.blake2b(orjson.dumps(payload, option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS), digest_size=16)
+    digest.update(variant.encode())
+    return digest.hexdigest()
+
+
+def set_attachment(resp, download_name: str):
+    """
+    Set Content-Disposition the way send_file does: quoted, with an ASCII fallback
+    plus an RFC 5987 filename* when the name isn't ASCII.
+    """
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        names = {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    else:
+        names = {"filename": download_name}
+    resp.headers.set("Content-Disposition", "attachment", **names)
+    return resp
+
+
+def with_cache_headers(resp, etag: str):
+    """
+    Attach ETag and Cache-Control to a response.
+    """
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp
+
+
+def matched_etag(etag: str) -> Optional[str]:
+    """
+    The entity tag in If-None-Match that matches etag, if any. flask-compress sends
+    compressed responses as "<etag>:<algorithm>", so those variants match too.
+    """
+    algorithms = dict.fromkeys(app.config["COMPRESS_ALGORITHM"] + app.config["COMPRESS_ALGORITHM_STREAMING"])
+    for candidate in [etag] + [f"{etag}:{algo}" for algo in algorithms]:
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def not_modified(etag: str):
+    """
+    Empty 304 response for a client that already holds etag.
+    """
+    return with_cache_headers(app.response_class(status=304), etag)
+
+
+@app.route("/")
+def index():
+    return render_template("index.html")
+
+
+@app.route("/api/<symbol>", methods=["GET"])
+def get_symbol(symbol):
+    """
+    Main API endpoint to fetch financial data for a symbol.
+    Uses yfinance under the hood. Returns JSON:
+    {
+      symbol, companyName, marketCap, revenue (latest), netIncome (latest),
+      peRatio, sector, latestAnnualReportLink, revenueHistory: [{year, revenue}, ...]
     }
+    """
+    symbol = symbol.strip().upper()
+    if not symbol:
+        return jsonify({"error": "Symbol required"}), 400
 
-    # Save search record (non-blocking - but we will save synchronously for simplicity)
     try:
-        save_search(symbol, company_name, result)
+        result = build_symbol_payload(symbol)
+    except Exception as e:
+        return jsonify({"error": f"Failed to create ticker: {str(e)}"}), 500
+
+    etag = payload_etag(result)
+    matched = matched_etag(etag) if has_financial_data(result) else None
+    if matched:
+        # Client already has this payload; skip the DB write as well
+        return not_modified(matched)
+
+    # Save search record (queued; written by the background writer)
+    try:
+        save_search(symbol, result["companyName"], result)
     except Exception:
         # Don't fail the request for DB problems; just continue
         pass
 
     # If no meaningful data found, return 404 with helpful error
-    if (market_cap is None and revenue_latest is None and net_income_latest is None and pe_ratio is None and sector is None):
+    if not has_financial_data(result):
         return jsonify({"error": f"No data found for symbol '{symbol}'. Please check the symbol and try again."}), 404
 
-    return jsonify(result)
+    return with_cache_headers(jsonify(result), etag)
 
 
 @app.route("/api/recent", methods=["GET"])
@@ -283,6 +656,52 @@ def api_recent():
     return jsonify({"recent": recent})
 
 
+@app.route("/api/recent/<int:search_id>/data", methods=["GET"])
+def api_recent_data(search_id):
+    """
+    Return the stored payload of one recent search (omitted from /api/recent).
+    """
+    record = fetch_search_data(search_id)
+    if record is None:
+        return jsonify({"error": f"Search {search_id} not found"}), 404
+    return jsonify(record)
+
+
+@app.route("/api/batch", methods=["GET"])
+def api_batch():
+    """
+    Fetch several symbols in one call (?symbols=AAPL,MSFT).
+    Each symbol is still its own set of yfinance requests; they just run concurrently.
+    """
+    raw = request.args.get("symbols") or ""
+    # Normalize and de-duplicate while preserving order
+    symbols = list(dict.fromkeys(s.strip().upper() for s in raw.replace(" ", ",").split(",") if s.strip()))
+    if not symbols:
+        return jsonify({"error": "Query parameter 'symbols' required"}), 400
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {BATCH_MAX_SYMBOLS} symbols per request"}), 400
+
+    futures = {sym: BATCH_EXECUTOR.submit(build_symbol_payload, sym) for sym in symbols}
+    wait(futures.values(), timeout=BATCH_TIMEOUT)
+
+    results = {}
+    for sym, future in futures.items():
+        if not future.done():
+            future.cancel()
+            results[sym] = {"error": "Timed out fetching data"}
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            results[sym] = {"error": f"Failed to fetch data: {str(e)}"}
+            continue
+        if has_financial_data(result):
+            results[sym] = result
+        else:
+            results[sym] = {"error": f"No data found for symbol '{sym}'."}
+    return jsonify({"results": results})
+
+
 @app.route("/export/<symbol>", methods=["GET"])
 def export_symbol(symbol):
     """
@@ -292,24 +711,24 @@ def export_symbol(symbol):
     - format=csv or format=xlsx (default xlsx)
     """
     fmt = (request.args.get("format") or "xlsx").lower()
-    # Reuse same logic as /api/<symbol> to obtain data
-    # For reliability, call internal API handler function (but not as HTTP)
-    with app.test_request_context():
-        resp = get_symbol(symbol)
-    # get_symbol might return (json, code) or response object
-    if hasattr(resp, "get_json"):
-        data = resp.get_json()
-        status_code = resp.status_code
-    else:
-        # if tuple
-        try:
-            data, status_code = resp
-        except Exception:
-            data = None
-            status_code = 500
-    if status_code != 200:
-        # Return same error response
-        return jsonify(data), status_code
+    symbol = symbol.strip().upper()
+    if not symbol:
+        return jsonify({"error": "Symbol required"}), 400
+
+    # Same pipeline as /api/<symbol>; usually a cache hit right after a lookup.
+    # Exports are not recorded as searches.
+    try:
+        data = build_symbol_payload(symbol)
+    except Exception as e:
+        return jsonify({"error": f"Failed to create ticker: {str(e)}"}), 500
+    if not has_financial_data(data):
+        return jsonify({"error": f"No data found for symbol '{symbol}'. Please check the symbol and try again."}), 404
+
+    # Hash the payload rather than the file: xlsx output embeds a creation time
+    etag = payload_etag(data, fmt)
+    matched = matched_etag(etag)
+    if matched:
+        return not_modified(matched)
 
     # Build a small DataFrame summarizing key metrics and revenue history
     summary = {
@@ -323,39 +742,58 @@ def export_symbol(symbol):
         "Revenue (Latest)": data.get("revenue"),
     }
 
-    # DF for summary
-    summary_df = pd.DataFrame(list(summary.items()), columns=["Metric", "Value"])
-
     # Revenue history
     revenue_history = data.get("revenueHistory") or []
-    rev_df = pd.DataFrame(revenue_history) if revenue_history else pd.DataFrame(columns=["year", "revenue"])
 
     if fmt == "csv":
-        # Create an in-memory zip or single CSV? We'll return a single CSV with summary then blank line then revenue table.
-        buf = io.StringIO()
-        summary_df.to_csv(buf, index=False)
-        buf.write("\n\n")
-        rev_df.to_csv(buf, index=False)
-        buf.seek(0)
-        return send_file(
-            io.BytesIO(buf.getvalue().encode("utf-8")),
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=f"{symbol}_financials.csv",
-        )
+        # A single CSV with summary then blank line then revenue table, streamed row by row
+        def generate():
+            line = io.StringIO()
+            writer = csv.writer(line, lineterminator="\n")
+
+            def emit(row):
+                writer.writerow(row)
+                text = line.getvalue()
+                line.seek(0)
+                line.truncate(0)
+                return text
+
+            yield emit(["Metric", "Value"])
+            for k, v in summary.items():
+                yield emit([k, cell_value(v)])
+            yield "\n\n"
+            yield emit(["year", "revenue"])
+            for entry in revenue_history:
+                yield emit([entry.get("year"), cell_value(entry.get("revenue"))])
+
+        resp = set_attachment(Response(generate(), mimetype="text/csv"), f"{symbol}_financials.csv")
     else:
-        # xlsx
+        # xlsx, written row by row; in_memory skips xlsxwriter's temp files for these small sheets
         buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-            summary_df.to_excel(writer, sheet_name="Summary", index=False)
-            rev_df.to_excel(writer, sheet_name="RevenueHistory", index=False)
+        wb = xlsxwriter.Workbook(buf, {"in_memory": True})
+        header_fmt = wb.add_format({"bold": True, "border": 1, "align": "center"})
+
+        ws = wb.add_worksheet("Summary")
+        ws.write_row(0, 0, ["Metric", "Value"], header_fmt)
+        for r, (k, v) in enumerate(summary.items(), start=1):
+            ws.write(r, 0, k)
+            ws.write(r, 1, cell_value(v))
+
+        ws = wb.add_worksheet("RevenueHistory")
+        ws.write_row(0, 0, ["year", "revenue"], header_fmt)
+        for r, entry in enumerate(revenue_history, start=1):
+            ws.write(r, 0, entry.get("year"))
+            ws.write(r, 1, cell_value(entry.get("revenue")))
+
+        wb.close()
         buf.seek(0)
-        return send_file(
+        resp = send_file(
             buf,
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             as_attachment=True,
             download_name=f"{symbol}_financials.xlsx",
         )
+    return with_cache_headers(resp, etag)
 
 
 if __name__ == "__main__":